@@ -1,47 +1,296 @@
 if (!window.dash_clientside) {
     window.dash_clientside = {};
 }
+
+// Ask the server for the next page of a column once it is scrolled near the
+// bottom. Only one request is made per page: the column has to grow before
+// another one is sent.
+function load_more_on_scroll(e) {
+    var container = e.target;
+    if (container.scrollTop + container.clientHeight < container.scrollHeight - 100) {
+        return;
+    }
+    if (container.dataset.requestedAt == container.scrollHeight) {
+        return;
+    }
+    container.dataset.requestedAt = container.scrollHeight;
+    var button = document.getElementById(container.id + "_load_more");
+    if (button) {
+        button.click();
+    }
+}
+
+// A click on a card's edit icon is sent on as an "editcard" event, which
+// edit_listener passes to the server with just the id of that card
+document.addEventListener("click", function (e) {
+    var icon = e.target.closest && e.target.closest(".edit-card");
+    if (icon) {
+        icon.dispatchEvent(new CustomEvent("editcard", {
+            bubbles: true,
+            detail: {cardID: icon.dataset.cardId}
+        }));
+    }
+});
+
+// The id of a card element next to a dropped card, or "" at either end of
+// the column
+function card_id_of(element) {
+    var card_id = element && element.querySelector(".cardID");
+    return card_id ? card_id.innerText : "";
+}
+
+// Compare two cards by column order: position, then id
+function compare_cards(position, card_id, other_position, other_card_id) {
+    if (position != other_position) {
+        return position < other_position ? -1 : 1;
+    }
+    return card_id - other_card_id;
+}
+
+// Whether a card pushed to the board passes the board filter, like
+// get_filter_criteria in app.py: searched words have to start one of the
+// card's words, as with the full-text index
+function matches_filter(fields, board_filter, archive) {
+    if (!board_filter) {
+        return true;
+    }
+    if (board_filter.stages.length && board_filter.stages.indexOf(fields.stage) == -1) {
+        return false;
+    }
+    if (!archive && (board_filter.due == "overdue" || board_filter.due == "week")
+        && fields.due != board_filter.due) {
+        return false;
+    }
+    if (board_filter.analyst !== null && fields.analysts.indexOf(board_filter.analyst) == -1) {
+        return false;
+    }
+    if (board_filter.due_from && !(fields.due_date && fields.due_date >= board_filter.due_from)) {
+        return false;
+    }
+    if (board_filter.due_to && !(fields.due_date && fields.due_date <= board_filter.due_to)) {
+        return false;
+    }
+    return board_filter.search.toLowerCase().split(/\s+/).every(function (term) {
+        return !term || fields.words.some(function (word) {
+            return word.startsWith(term);
+        });
+    });
+}
+
+// The one dragula instance of the page. Columns are added to it as they are
+// rendered, and its listeners are only ever attached once.
+var drake = null;
+// The last drop sent to the server, to drop repeats of the same event
+var last_drop = null;
+
+function get_drake() {
+    if (drake) {
+        return drake;
+    }
+    drake = dragula({});
+    drake.on("over", function (el, container) {
+        // Add a class to the target container to change its background color
+        container.classList.add("drag-over");
+    });
+
+    drake.on("out", function (el, container) {
+        // Remove the class from the target container when the card is out
+        container.classList.remove("drag-over");
+    });
+
+    drake.on("dragend", function (el) {
+        // Remove the class from all containers when dragging ends
+        document.querySelectorAll(".drag-over").forEach(function (container) {
+            container.classList.remove("drag-over");
+        });
+    });
+    drake.on("drop", function (_el, target, source, sibling) {
+        var detail = {
+            sourceContainer: source.id,
+            targetContainer: target.id,
+            draggedCardID: _el.querySelector(".cardID").innerText,
+            cardVersion: _el.querySelector(".cardID").dataset.version,
+            previousCardID: card_id_of(_el.previousElementSibling),
+            nextCardID: card_id_of(sibling)
+        };
+        // Put the card back: the columns belong to Dash, and the "moved"
+        // delta brings the card to its new place like in any other browser.
+        // A move that conflicts leaves it where it was.
+        drake.cancel(true);
+        var key = JSON.stringify(detail);
+        if (key == last_drop) {
+            return;
+        }
+        last_drop = key;
+
+        const drop_complete = new CustomEvent('dropcomplete', {
+            bubbles: true,
+            detail: detail
+        });
+        target.dispatchEvent(drop_complete)
+    });
+    return drake;
+}
+
 window.dash_clientside.clientside = {
     make_draggable: function () {
-        let args = Array.from(arguments);
-        var els = [];
+        // The arguments are the ids of the columns, then the children of
+        // their parent
+        var ids = Array.from(arguments).filter(function (arg) {
+            return typeof arg == "string";
+        });
         setTimeout(function () {
-            var drake = dragula({});
-            for (i = 0; i < args.length; i++){
-                els[i] = document.getElementById(args[i]);
-                drake.containers.push(els[i]);
+            var drake = get_drake();
+            // Forget columns that have left the page
+            for (var i = drake.containers.length - 1; i >= 0; i--) {
+                if (!document.body.contains(drake.containers[i])) {
+                    drake.containers.splice(i, 1);
+                }
             }
-            drake.on("over", function (el, container) {
-                // Add a class to the target container to change its background color
-                container.classList.add("drag-over");
+            ids.forEach(function (id) {
+                var container = document.getElementById(id);
+                if (!container || drake.containers.indexOf(container) != -1) {
+                    return;
+                }
+                drake.containers.push(container);
+                container.addEventListener("scroll", load_more_on_scroll);
             });
+        }, 1)
+        return window.dash_clientside.no_update
+    },
+    set_client_id: function () {
+        // Identifies this browser in the deltas of the cards it creates
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    },
+    open_modal: function (n_clicks) {
+        return true;
+    },
+    toggle_attachments: function (n_clicks, requested) {
+        // Odd clicks show the attachments. They are only requested from the
+        // server the first time; later toggles stay in the browser.
+        if (n_clicks % 2 == 1) {
+            return [
+                {"display": "block"},
+                requested ? window.dash_clientside.no_update : "true"
+            ];
+        }
+        return [{"display": "none"}, window.dash_clientside.no_update];
+    },
+    apply_archive_counts: function (message) {
+        // Arguments after the message are the ids of the archive columns'
+        // count badges
+        var delta = JSON.parse(message);
+        return Array.from(arguments).slice(1).map(function (id) {
+            return delta.counts
+                ? delta.counts[id.replace(/_count$/, "")]
+                : window.dash_clientside.no_update;
+        });
+    },
+    apply_board_delta: function (message) {
+        // Arguments after the message are the children of every column,
+        // then their paging cursors, both in container order, and last the
+        // board filter and the id of this browser
+        var delta = JSON.parse(message);
+        var count = (arguments.length - 3) / 2;
+        var columns = Array.from(arguments).slice(1, 1 + count);
+        var cursors = Array.from(arguments).slice(1 + count, 1 + 2 * count);
+        var board_filter = arguments[arguments.length - 2];
+        var client_id = arguments[arguments.length - 1];
+        var archives = ["drag_container8", "drag_container9"];
+        var containers = window.dash_clientside.callback_context.states_list
+            .slice(0, count)
+            .map(function (state) { return state.id; });
+        var no_update = window.dash_clientside.no_update;
+        var changed = columns.map(function () { return false; });
 
-            drake.on("out", function (el, container) {
-                // Remove the class from the target container when the card is out
-                container.classList.remove("drag-over");
+        // This browser created the card itself: add_new_card's response adds
+        // it, and the delta can arrive before it
+        if (delta.action == "created" && delta.client_id && delta.client_id == client_id) {
+            return columns.map(function () { return no_update; });
+        }
+
+        var index_of = function (children) {
+            return children.findIndex(function (child) {
+                return child.props.id.index == delta.card_id;
             });
+        };
+        // The version and position rendered into a card's hidden cardID
+        // paragraph
+        var version_of = function (card) {
+            return Number(card.props.children[0].props.children[0].props["data-version"]);
+        };
+        var position_of = function (card) {
+            return card.props.children[0].props.children[0].props["data-position"];
+        };
+        var compare_to_delta = function (card) {
+            return compare_cards(
+                position_of(card), card.props.id.index, delta.position, delta.card_id
+            );
+        };
+
+        columns = columns.map(function (children) { return children || []; });
 
-            drake.on("dragend", function (el) {
-                // Remove the class from all containers when dragging ends
-                document.querySelectorAll(".drag-over").forEach(function (container) {
-                    container.classList.remove("drag-over");
+        // A card that no longer passes the board filter leaves the board as
+        // if it was deleted
+        var filtered_out = delta.action != "deleted" && !matches_filter(
+            delta.fields, board_filter, archives.indexOf(delta.container) != -1
+        );
+
+        // Deltas can arrive late or twice; never go back to an older card
+        var stale = columns.some(function (children) {
+            var index = index_of(children);
+            return index != -1 && version_of(children[index]) >= delta.version;
+        });
+        if (stale) {
+            return columns.map(function () { return no_update; });
+        }
+
+        columns = columns.map(function (children, i) {
+            var index = index_of(children);
+            if (index == -1) {
+                return children;
+            }
+            if (filtered_out) {
+                children = children.slice(0, index).concat(children.slice(index + 1));
+            } else if (delta.action == "updated") {
+                // Already here: swap in the new rendering
+                children = children.slice();
+                children[index] = delta.card;
+            } else if (delta.action != "created") {
+                // Deleted, or moved; a moved card is added back at its new
+                // position below
+                children = children.slice(0, index).concat(children.slice(index + 1));
+            }
+            changed[i] = true;
+            return children;
+        });
+
+        if ((delta.action == "created" || delta.action == "moved") && !filtered_out) {
+            var target = containers.indexOf(delta.container);
+            var children = columns[target] || [];
+            // Columns are in position order. Only add the card if it falls in
+            // the part of the column that has been loaded; the rest will come
+            // in with the next page. Collapsed archive columns stay empty.
+            var loaded = children.length
+                ? compare_to_delta(children[children.length - 1]) > 0
+                  || cursors[target] === null
+                : cursors[target] === null && archives.indexOf(delta.container) == -1;
+            if (target != -1 && index_of(children) == -1 && loaded) {
+                var position = children.findIndex(function (child) {
+                    return compare_to_delta(child) > 0;
                 });
-            });
-            drake.on("drop", function (_el, target, source, sibling) {
-                
-                var card_id = _el.querySelector(".cardID").innerText;
-
-                const drop_complete = new CustomEvent('dropcomplete', {
-                    bubbles: true,
-                    detail: {
-                        sourceContainer: source.id,
-                        targetContainer: target.id,
-                        draggedCardID: card_id
-                    }
-                  });
-                target.dispatchEvent(drop_complete)
-            })
-        }, 1)
-        return window.dash_clientside.no_update
+                if (position == -1) {
+                    position = children.length;
+                }
+                columns[target] = children
+                    .slice(0, position)
+                    .concat([delta.card], children.slice(position));
+                changed[target] = true;
+            }
+        }
+
+        return columns.map(function (children, i) {
+            return changed[i] ? children : no_update;
+        });
     }
 }
\ No newline at end of file
@@ -0,0 +1,404 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from plotly.utils import PlotlyJSONEncoder
+from sqlalchemy import insert
+from sqlalchemy.event import listen
+
+# Benchmark the board against synthetic databases of increasing size:
+#
+#   python benchmark.py                       # 1k, 10k and 100k cards
+#   python benchmark.py --sizes 1000 --repeat 10 --json results.json
+#   python benchmark.py --card-budget 150     # fail above 150 bytes per card
+#
+# app.py binds its engine to DATABASE_URL on import, so every size is seeded
+# and measured in a child process of its own against a scratch database.
+
+SIZES = [1000, 10000, 100000]
+ANALYSTS = ["Analyst %d" % number for number in range(1, 21)]
+SEED_CHUNK_SIZE = 5000
+# Brotli compressed layout bytes per card on the board
+CARD_BUDGET = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the board")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument(
+        "--card-budget",
+        type=float,
+        default=CARD_BUDGET,
+        help="compressed layout bytes per card allowed (default %(default)s)",
+    )
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.database:
+        # Child process: measure a single size and report it on stdout
+        print(json.dumps(run(args.sizes[0], args.repeat)))
+        return
+
+    results = {}
+    over_budget = False
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "benchmark.db")
+            child = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--sizes",
+                    str(size),
+                    "--repeat",
+                    str(args.repeat),
+                    "--database",
+                    database,
+                ],
+                env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.PIPE,
+                check=True,
+                text=True,
+            )
+        results[size] = json.loads(child.stdout.splitlines()[-1])
+        report(size, results[size])
+        over_budget |= results[size]["bytes_per_card"] > args.card_budget
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if over_budget:
+        sys.exit(f"Layout is over the budget of {args.card_budget} bytes per card")
+
+
+def report(size, results):
+    measurements = results["measurements"]
+    print(f"\n{size} cards")
+    print(f"{'':40} {'median ms':>10} {'max ms':>10} {'queries':>8} {'bytes':>10}")
+    for name, measurement in measurements.items():
+        print(
+            f"{name:40} {measurement['median_ms']:10.1f} {measurement['max_ms']:10.1f}"
+            f" {measurement['queries']:8} {measurement['bytes']:10}"
+        )
+    print(
+        f"{results['cards_on_board']} cards on the board, "
+        f"{results['bytes_per_card']:.1f} compressed layout bytes per card"
+    )
+
+
+# Fill the cards, analyst, attachments and logs tables with `size` cards
+# spread over every stage, newest first in each column, a tenth of them deleted, each with up to three
+# attachments and a stage history leading to its current stage
+def seed(app, size):
+    stages = app.BOARD_STAGES + app.ARCHIVE_STAGES
+    generator = random.Random(size)
+    now = datetime.now()
+    # Newer cards go on top of their column, as if created one by one
+    top_positions = dict.fromkeys(stages)
+    with app.engine.begin() as connection:
+        connection.execute(insert(app.Analyst), [{"name": name} for name in ANALYSTS])
+        for first_id in range(1, size + 1, SEED_CHUNK_SIZE):
+            card_ids = range(first_id, min(first_id + SEED_CHUNK_SIZE, size + 1))
+            cards, attachments, logs = [], [], []
+            for card_id in card_ids:
+                primary, secondary = generator.sample(range(len(ANALYSTS)), 2)
+                created_at = now - timedelta(days=generator.randrange(365))
+                stage = generator.choice(stages)
+                top_positions[stage] = app.position_between(None, top_positions[stage])
+                cards.append(
+                    {
+                        "id": card_id,
+                        "stage": stage,
+                        "position": top_positions[stage],
+                        "entry_datetime": created_at,
+                        "stock_name": f"Stock {card_id}",
+                        "due_date": (
+                            created_at + timedelta(days=generator.randrange(90))
+                        ).date(),
+                        "analyst_name": ANALYSTS[primary],
+                        "second_analyst": ANALYSTS[secondary],
+                        "primary_analyst_id": primary + 1,
+                        "secondary_analyst_id": secondary + 1,
+                        "Sedol": generator.randrange(100000000),
+                        "ISIN": generator.randrange(100000000),
+                        "active": int(generator.random() >= 0.1),
+                    }
+                )
+                attachments.extend(
+                    {
+                        "card_id": card_id,
+                        "position": position,
+                        "url": f"https://example.com/{card_id}/{position}",
+                        "name": f"Document {position + 1}",
+                    }
+                    for position in range(generator.randrange(4))
+                )
+                history = stages[: stages.index(stage) + 1]
+                timestamp = created_at
+                for old_stage, new_stage in zip(history, history[1:]):
+                    timestamp += timedelta(hours=generator.randrange(1, 240))
+                    logs.append(
+                        {
+                            "card_id": card_id,
+                            "timestamp": timestamp,
+                            "old_stage": old_stage,
+                            "new_stage": new_stage,
+                        }
+                    )
+            connection.execute(insert(app.Card), cards)
+            if attachments:
+                connection.execute(insert(app.Attachment), attachments)
+            if logs:
+                connection.execute(insert(app.Log), logs)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        listen(engine, "before_cursor_execute", self.increment)
+
+    def increment(self, *args):
+        self.count += 1
+
+
+# Call `function` `repeat` times, keeping the wall time of every call, the
+# queries of the last one and the size of its result as returned by `size_of`
+def measure(function, repeat, counter, size_of):
+    timings = []
+    for _ in range(repeat):
+        counter.count = 0
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": statistics.median(timings),
+        "max_ms": max(timings),
+        "queries": counter.count,
+        "bytes": size_of(result),
+    }
+
+
+def run(size, repeat):
+    import app
+
+    app.engine.echo = False
+    server = app.app.server
+    seed(app, size)
+    counter = QueryCounter(app.engine)
+    client = server.test_client()
+    client.get("/")
+
+    def layout_bytes(layout):
+        return len(json.dumps(layout, cls=PlotlyJSONEncoder))
+
+    def response_bytes(response):
+        assert response.status_code in (200, 204), response.data[:500]
+        return len(response.data)
+
+    def get_layout(encoding):
+        response = client.get("/_dash-layout", headers={"Accept-Encoding": encoding})
+        assert response.headers.get("Content-Encoding") == encoding
+        return response
+
+    def render_cold():
+        app.cache.clear()
+        app.rendered_cards.clear()
+        with server.app_context():
+            return app.get_layout_body()
+
+    # A write invalidates the cached layout, but not the rendered cards
+    def render_after_write():
+        app.cache.clear()
+        with server.app_context():
+            return app.get_layout_body()
+
+    def render_warm():
+        with server.app_context():
+            return app.get_layout_body()
+
+    results = {
+        "get_layout_body (cold cache)": measure(render_cold, repeat, counter, len),
+        "get_layout_body (after a write)": measure(
+            render_after_write, repeat, counter, len
+        ),
+        "get_layout_body (cached)": measure(render_warm, repeat, counter, len),
+        "GET /_dash-layout": measure(
+            lambda: client.get("/_dash-layout"), repeat, counter, response_bytes
+        ),
+        "GET /_dash-layout (gzip)": measure(
+            lambda: get_layout("gzip"), repeat, counter, response_bytes
+        ),
+        "GET /_dash-layout (br)": measure(
+            lambda: get_layout("br"), repeat, counter, response_bytes
+        ),
+    }
+
+    with server.app_context():
+        board, cursors = app.get_board()
+        cards = [card for stage in app.BOARD_STAGES for card in board[stage]]
+        results["generate_card_body (every board card)"] = measure(
+            lambda: [app.generate_card_body(card) for card in cards],
+            repeat,
+            counter,
+            layout_bytes,
+        )
+
+    # Callbacks go through /_dash-update-component like the browser's
+    # requests, with every card of the first page on the board
+    def callback(output, outputs, inputs, state, changed):
+        return client.post(
+            "/_dash-update-component",
+            json={
+                "output": output,
+                "outputs": outputs,
+                "inputs": inputs,
+                "state": state,
+                "changedPropIds": changed,
+            },
+        )
+
+    dependencies = json.loads(client.get("/_dash-dependencies").data)
+
+    def output_of(component_id):
+        return next(
+            dependency["output"]
+            for dependency in dependencies
+            if component_id in dependency["output"]
+        )
+
+    card = cards[0]
+
+    results["open_update_card_modal"] = measure(
+        lambda: callback(
+            output_of("update_secondary_analyst.value"),
+            [
+                {"id": "update_card_modal", "property": "is_open"},
+                {"id": "update_card_id", "property": "data"},
+                {"id": "update_card_version", "property": "data"},
+                {"id": "update_secondary_analyst", "property": "value"},
+                {"id": "update_attachments", "property": "children"},
+                {"id": "conflict_toast", "property": "is_open"},
+            ],
+            [
+                {"id": "edit_listener", "property": "n_events", "value": 1},
+                {"id": "update_card_button", "property": "n_clicks"},
+            ],
+            [
+                {
+                    "id": "edit_listener",
+                    "property": "event",
+                    "value": {"detail.cardID": str(card.id)},
+                },
+                {"id": "update_card_id", "property": "data"},
+                {"id": "update_card_version", "property": "data"},
+                {"id": "update_secondary_analyst", "property": "value"},
+                [],
+                [],
+            ],
+            ["edit_listener.n_events"],
+        ),
+        repeat,
+        counter,
+        response_bytes,
+    )
+
+    results["add_new_card"] = measure(
+        lambda: callback(
+            output_of("create_card_modal.is_open"),
+            [
+                {"id": "create_card_modal", "property": "is_open"},
+                {"id": "drag_container1", "property": "children"},
+            ],
+            [{"id": "create_card_button", "property": "n_clicks", "value": 1}],
+            [
+                {"id": "stock_name", "property": "value", "value": "Benchmark"},
+                {"id": "due_date", "property": "date", "value": "2030-01-01"},
+                {"id": "primary_analyst", "property": "value", "value": 1},
+                {"id": "secondary_analyst", "property": "value", "value": 2},
+                {"id": "link1", "property": "value", "value": "https://example.com"},
+                {"id": "link1_name", "property": "value", "value": "Example"},
+            ]
+            + [
+                {"id": f"{link}{suffix}", "property": "value"}
+                for link in ["link2", "link3", "link4", "link5", "other"]
+                for suffix in ["", "_name"]
+            ]
+            + [
+                {
+                    "id": "board_filter",
+                    "property": "data",
+                    "value": app.DEFAULT_BOARD_FILTER,
+                },
+                {"id": "client_id", "property": "data", "value": "benchmark"},
+            ],
+            ["create_card_button.n_clicks"],
+        ),
+        repeat,
+        counter,
+        response_bytes,
+    )
+
+    # Drag the same card back and forth to the top of the first two columns
+    moved = {"container": "drag_container1", "version": None}
+
+    def move_card():
+        target = (
+            "drag_container2"
+            if moved["container"] == "drag_container1"
+            else "drag_container1"
+        )
+        response = callback(
+            output_of("order.children"),
+            [
+                {"id": "order", "property": "children"},
+                {"id": "conflict_toast", "property": "is_open"},
+            ],
+            [{"id": "el", "property": "n_events", "value": 1}],
+            [
+                {
+                    "id": "el",
+                    "property": "event",
+                    "value": {
+                        "detail.sourceContainer": moved["container"],
+                        "detail.targetContainer": target,
+                        "detail.draggedCardID": str(card.id),
+                        "detail.cardVersion": str(moved["version"]),
+                        "detail.previousCardID": "",
+                        "detail.nextCardID": "",
+                    },
+                }
+            ],
+            ["el.n_events"],
+        )
+        assert not json.loads(response.data)["response"]["conflict_toast"]["is_open"]
+        moved["container"] = target
+        moved["version"] += 1
+        return response
+
+    # The first card of the board sits in the first column with cards, so
+    # start it out in Ideas
+    with server.app_context():
+        moved["version"] = app.update_card_if_current(
+            card.id, card.version, stage="Ideas"
+        ).version
+        app.session.commit()
+    results["update_card"] = measure(move_card, repeat, counter, response_bytes)
+    return {
+        "measurements": results,
+        "cards_on_board": len(cards),
+        "bytes_per_card": results["GET /_dash-layout (br)"]["bytes"] / len(cards),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import sys
+
+from app import (
+    export_cards,
+    import_cards,
+    read_import_records,
+    rebuild_stage_summary,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export of cards")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import", help="Create cards from a .csv, .json or .jsonl file"
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--chunk-size", type=int, default=500)
+
+    export_parser = commands.add_parser(
+        "export", help="Write every card and its stage history as JSON lines"
+    )
+    export_parser.add_argument("path", nargs="?", help="defaults to stdout")
+
+    commands.add_parser(
+        "rebuild-summary", help="Recompute the stage summary from the stage history"
+    )
+
+    args = parser.parse_args()
+
+    # Imports bump the board version in the database, so running servers
+    # pick the new cards up whatever cache backend they use
+    if args.command == "import":
+        count = import_cards(read_import_records(args.path), args.chunk_size)
+        print(f"Imported {count} cards", file=sys.stderr)
+    elif args.command == "rebuild-summary":
+        count = rebuild_stage_summary()
+        print(f"Wrote {count} summary rows", file=sys.stderr)
+    else:
+        output = open(args.path, "w") if args.path else sys.stdout
+        try:
+            output.writelines(export_cards())
+        finally:
+            if args.path:
+                output.close()
+
+
+if __name__ == "__main__":
+    main()
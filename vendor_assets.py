@@ -0,0 +1,91 @@
+import argparse
+import hashlib
+import os
+import sys
+from urllib.request import urlopen
+
+# Third-party front-end files, committed under assets/vendor so that the board
+# is served without any CDN:
+#
+#   python vendor_assets.py            # check the committed files
+#   python vendor_assets.py --fetch    # download missing or changed files
+#
+# Every file is the published artifact, byte for byte, pinned by its sha256; a
+# download that does not match is not written. A file whose hash is not pinned
+# yet is written by --fetch, which prints the hash to copy into VENDOR_FILES;
+# until then the check fails. app.py refuses to start when a file is missing,
+# unless ALLOW_CDN_ASSETS=1 lets it load the file from its CDN instead.
+
+ASSETS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+# Paths under assets/, with their hash and CDN URL
+VENDOR_FILES = {
+    # The dragula release the board has always loaded
+    "vendor/dragula.min.js": {
+        "sha256": None,
+        "cdn": "https://cdnjs.cloudflare.com/ajax/libs/dragula/3.7.2/dragula.min.js",
+    },
+    # The version dash-bootstrap-components links to
+    "vendor/bootstrap.min.css": {
+        "sha256": "7f1d37f0d90b6385354c2ac10e2bb91563c46bd7a266ed351222ebcac8496c2a",
+        "cdn": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+    },
+    # The version dash-bootstrap-components links to (dbc.icons.BOOTSTRAP)
+    "vendor/bootstrap-icons/bootstrap-icons.css": {
+        "sha256": None,
+        "cdn": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/"
+        "bootstrap-icons.css",
+    },
+    # Loaded by bootstrap-icons.css, relative to it
+    "vendor/bootstrap-icons/fonts/bootstrap-icons.woff2": {
+        "sha256": None,
+        "cdn": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/fonts/"
+        "bootstrap-icons.woff2",
+    },
+    "vendor/bootstrap-icons/fonts/bootstrap-icons.woff": {
+        "sha256": None,
+        "cdn": "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.3/font/fonts/"
+        "bootstrap-icons.woff",
+    },
+}
+
+
+def hash_file(path):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or fetch vendored assets")
+    parser.add_argument(
+        "--fetch", action="store_true", help="download missing or changed files"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for filename, vendor_file in VENDOR_FILES.items():
+        path = os.path.join(ASSETS_FOLDER, filename)
+        digest = hash_file(path) if os.path.exists(path) else None
+        if args.fetch and (digest is None or digest != vendor_file["sha256"]):
+            with urlopen(vendor_file["cdn"]) as response:
+                content = response.read()
+            fetched = hashlib.sha256(content).hexdigest()
+            if vendor_file["sha256"] in (None, fetched):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as file:
+                    file.write(content)
+                digest = fetched
+            else:
+                print(f"{vendor_file['cdn']} does not match", file=sys.stderr)
+        if vendor_file["sha256"] is None:
+            status = "UNPINNED"
+        else:
+            status = "ok" if digest == vendor_file["sha256"] else "MISMATCH"
+        failed |= status != "ok"
+        print(f"{status:8} sha256:{digest} {filename}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()